@@ -7,20 +7,22 @@ and creates a pull/merge request (depending whether on GitHub or GitLab)
 with the specified reviewers (if any).
 """
 
-import argparse
 import datetime
 import functools
 import getpass
 import itertools
 import json
 import logging
+import netrc
 import os
 import platform
 import re
+import shutil
 import subprocess
 import sys
 import typing
 import unicodedata
+from concurrent import futures
 from html import parser as html_parser
 from os import path
 from typing import (
@@ -129,16 +131,8 @@ try:
 except ImportError:
     requests = None  # type: ignore
     LuccaSession = None  # pylint: disable=invalid-name
-try:
-    import argcomplete
-except ImportError:
-    # This is not needed for the script to work.
-    argcomplete = None
-try:
+if typing.TYPE_CHECKING:
     import gitlab
-except ImportError:
-    # This is not needed when pushing to a Github repo.
-    gitlab = None
 
 # TODO(cyrille): Lint, type and test.
 
@@ -154,10 +148,10 @@ _ONE_MINUTE = 60
 _COMMA_SEPARATION_REGEX = re.compile(r"\s*,\s*")
 # Chars we want to avoid in branch names.
 _FORBIDDEN_CHARS_REGEX = re.compile(r"[#\u0300-\u036f]")
-# Remote URL pattern for Gitlab repos.
-_GITLAB_URL_REGEX = re.compile(r"^git@gitlab\.com:(.*)\.git")
-# Remote URL pattern for Github repos.
-_GITHUB_URL_REGEX = re.compile(r"^git@github\.com:(.*)\.git")
+# Remote URL prefixes for Gitlab repos.
+_GITLAB_URL_PREFIXES = ("git@gitlab.com:", "https://gitlab.com/")
+# Remote URL prefixes for Github repos.
+_GITHUB_URL_PREFIXES = ("git@github.com:", "https://github.com/")
 # Word pattern, for slugging.
 _WORD_REGEX = re.compile(r"\w+")
 # Default value for the browse action.
@@ -216,18 +210,70 @@ def _xtrace(command: Sequence[str]) -> None:
     )
 
 
-def _run_git(command: list[str], *, env: Optional[dict[str, str]] = None) -> str:
+def _popen_git(
+    command: list[str], *, lean: bool = False, **kwargs: Any
+) -> "subprocess.Popen[str]":
+    """Start a git subcommand.
+
+    Lean commands are read-only queries whose output is only parsed by this script: they skip
+    locale handling and optional lock files. Other commands (e.g. push or checkout) may run the
+    user's hooks or print messages for them, so they keep the user's environment.
+    """
+
     full_command = ["git"] + command
     _xtrace(full_command)
-    return subprocess.check_output(full_command, text=True, env=env).strip()
+    kwargs.setdefault("stdin", subprocess.DEVNULL)
+    env = dict(os.environ, LC_ALL="C", GIT_OPTIONAL_LOCKS="0") if lean else None
+    return subprocess.Popen(full_command, text=True, env=env, **kwargs)
+
+
+def _run_git(command: list[str], *, lean: bool = False) -> str:
+    with _popen_git(command, lean=lean, stdout=subprocess.PIPE) as process:
+        stdout, unused_stderr = process.communicate()
+    if process.returncode:
+        raise subprocess.CalledProcessError(
+            process.returncode, ["git"] + command, output=stdout
+        )
+    return stdout.strip()
 
 
+@functools.lru_cache(maxsize=None)
 def _has_git_diff(base: str) -> bool:
-    try:
-        _run_git(["diff", "--quiet", base])
-        return False
-    except subprocess.CalledProcessError:
-        return True
+    # A non-zero exit code is expected whenever there is a diff, so do not raise on it.
+    with _popen_git(["diff", "--quiet", base], lean=True) as process:
+        return bool(process.wait())
+
+
+class _GitBatch:
+    """A single long-running git process to resolve several references."""
+
+    def __init__(self) -> None:
+        self._process: Optional["subprocess.Popen[str]"] = None
+
+    def __enter__(self) -> "_GitBatch":
+        self._process = _popen_git(
+            ["cat-file", "--batch-check=%(objectname)"],
+            lean=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        return self
+
+    def __exit__(self, *unused_args: Any) -> None:
+        if not self._process:
+            return
+        self._process.communicate()
+        self._process = None
+
+    def resolve(self, ref: str) -> Optional[str]:
+        """Get the object name for the given reference, or None if it does not exist."""
+
+        if not self._process or not self._process.stdin or not self._process.stdout:
+            raise ValueError("The git batch process is not running.")
+        self._process.stdin.write(f"{ref}\n")
+        self._process.stdin.flush()
+        sha1, *status = self._process.stdout.readline().strip().split(" ")
+        return None if status else sha1
 
 
 # TODO(cyrille): Use tuples rather than lists.
@@ -251,6 +297,86 @@ def _graphql(
     )
 
 
+@functools.lru_cache()
+def _get_github_token() -> Optional[str]:
+    """Find a token to call the Github API directly, in env or in ~/.netrc.
+
+    This only speeds up creating pull requests and assigning reviewers: hub is still
+    needed to list pull requests, engineers and labels, and as a fallback if the token
+    is rejected.
+    """
+
+    if token := os.getenv("GITHUB_TOKEN"):
+        return token
+    try:
+        netrc_file = netrc.netrc()
+    except (OSError, netrc.NetrcParseError):
+        return None
+    for host in ("api.github.com", "github.com"):
+        if authenticators := netrc_file.authenticators(host):
+            return authenticators[2]
+    return None
+
+
+class _GithubAPIError(_ScriptError):
+    """An error response from the Github API."""
+
+    def __init__(self, url: str, code: int, body: bytes) -> None:
+        try:
+            content = json.loads(body)
+            details = [content.get("message", "")] + [
+                error if isinstance(error, str) else error.get("message", str(error))
+                for error in content.get("errors", [])
+            ]
+        except (AttributeError, ValueError):
+            details = [body.decode("utf-8", errors="replace")]
+        super().__init__(
+            "Github API error %d on %s:\n%s",
+            code,
+            url,
+            "\n".join(detail for detail in details if detail),
+        )
+        self.code = code
+
+
+class _GithubNetworkError(_ScriptError):
+    """A failure to reach the Github API."""
+
+    def __init__(self, url: str, reason: Any) -> None:
+        super().__init__("Could not reach the Github API on %s:\n%s", url, reason)
+
+
+# Stop waiting for a stalled connection to the Github API after this delay, in seconds.
+_GITHUB_API_TIMEOUT = 30
+
+
+def _post_github_api(api_path: str, payload: dict[str, Any], token: str) -> Any:
+    # Only imported here, as hub is used when no token is available.
+    from urllib import error, request  # pylint: disable=import-outside-toplevel
+
+    url = f"https://api.github.com{api_path}"
+    _xtrace(["POST", url])
+    api_request = request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        method="POST",
+        headers={
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {token}",
+        },
+    )
+    try:
+        with request.urlopen(api_request, timeout=_GITHUB_API_TIMEOUT) as response:
+            return json.load(response)
+    except error.HTTPError as http_error:
+        raise _GithubAPIError(url, http_error.code, http_error.read()) from http_error
+    except OSError as network_error:
+        # Includes URLError (DNS, proxy or TLS failures) and timeouts.
+        raise _GithubNetworkError(
+            url, getattr(network_error, "reason", network_error)
+        ) from network_error
+
+
 _GithubAPIReference = TypedDict("_GithubAPIReference", {"ref": str})
 _GithubAPIUser = TypedDict("_GithubAPIUser", {"login": str})
 
@@ -357,7 +483,8 @@ class _GitConfig:
         return _run_git(
             ["config", "--default", ""]
             + (["--global"] if is_global else [])
-            + ["--get", key]
+            + ["--get", key],
+            lean=True,
         )
 
     def set_config(self, key: str, value: str, *, is_global: bool = False) -> None:
@@ -456,32 +583,67 @@ class _References(typing.NamedTuple):
     merge_base: str
 
 
+class _GitContext(typing.NamedTuple):
+    """Git metadata about the current branch, fetched all at once."""
+
+    # Local branch at HEAD, if any.
+    head: Optional[str]
+    # Default branch on the remote repository, if the remote HEAD is set.
+    default: Optional[str]
+    # Remote branch the local branch at HEAD is tracking, if any.
+    existing_remote: Optional[str]
+    # All local branches, sorted by name.
+    branches: tuple[str, ...]
+
+
+@functools.lru_cache()
+def _get_git_context() -> _GitContext:
+    """Read local branches, remote HEAD and upstream with a single git command."""
+
+    head = default = existing_remote = None
+    branches: list[str] = []
+    for line in _run_git(
+        [
+            "for-each-ref",
+            "--format=%(refname)%00%(HEAD)%00%(symref:lstrip=3)%00%(upstream:remoteref)",
+            "refs/heads/",
+            f"refs/remotes/{_REMOTE_REPO}/HEAD",
+        ],
+        lean=True,
+    ).split("\n"):
+        if not line:
+            continue
+        refname, is_head, symref, upstream = line.split("\0")
+        if refname == f"refs/remotes/{_REMOTE_REPO}/HEAD":
+            default = symref or None
+            continue
+        branches.append(refname.removeprefix("refs/heads/"))
+        if is_head == "*":
+            head = branches[-1]
+            existing_remote = upstream.removeprefix("refs/heads/") or None
+    return _GitContext(head, default, existing_remote, tuple(branches))
+
+
 # TODO(cyrille): Consider uncaching.
 @functools.lru_cache()
 def _get_head() -> str:
-    if branch := _run_git(["rev-parse", "--abbrev-ref", "HEAD"]):
+    if branch := _get_git_context().head:
         return branch
     raise _ScriptError("Unable to find a branch at HEAD")
 
 
 @functools.lru_cache()
 def _get_default() -> str:
-    try:
-        return _run_git(["rev-parse", "--abbrev-ref", f"{_REMOTE_REPO}/HEAD"]).split(
-            "/"
-        )[1]
-    except subprocess.CalledProcessError as error:
-        raise _ScriptError(
-            "Unable to find a remote HEAD reference.\n"
-            f"Please run `git remote set-head {_REMOTE_REPO} -a` and rerun your command."
-        ) from error
+    if default := _get_git_context().default:
+        return default
+    raise _ScriptError(
+        "Unable to find a remote HEAD reference.\n"
+        f"Please run `git remote set-head {_REMOTE_REPO} -a` and rerun your command."
+    )
 
 
-@functools.lru_cache()
 def _get_existing_remote() -> Optional[str]:
-    if remote := _GIT_CONFIG.get_config(f"branch.{_get_head()}.merge"):
-        return remote[len("refs.heads.") :]
-    return None
+    return _get_git_context().existing_remote
 
 
 def _create_branch_for_review(merge_base: str, username: str) -> Optional[str]:
@@ -489,7 +651,7 @@ def _create_branch_for_review(merge_base: str, username: str) -> Optional[str]:
     if not _has_git_diff(merge_base):
         # No new commit to review.
         return None
-    title = _run_git(["log", "-1", r"--format=%s"])
+    title = _run_git(["log", "-1", r"--format=%s"], lean=True)
     prefix = f"{_REMOTE_REPO}/{username}-"
     # Create a clean branch name from the first two words of the commit message.
     branch = "-".join(
@@ -509,7 +671,8 @@ def _create_branch_for_review(merge_base: str, username: str) -> Optional[str]:
                 f"{prefix}{branch}*",
                 "-l",
                 f"{branch}*",
-            ]
+            ],
+            lean=True,
         ).split("\n")
         if b
     }
@@ -523,6 +686,7 @@ def _create_branch_for_review(merge_base: str, username: str) -> Optional[str]:
     _run_git(["checkout", "-"])
     _run_git(["reset", "--hard", merge_base])
     _run_git(["checkout", "-"])
+    _get_git_context.cache_clear()
     _get_head.cache_clear()
     return branch
 
@@ -530,26 +694,19 @@ def _create_branch_for_review(merge_base: str, username: str) -> Optional[str]:
 def _get_git_branches(username: str, base: Optional[str], is_new: bool) -> _References:
     """Compute the different branch names that will be needed throughout the script."""
 
-    if _has_git_diff("HEAD"):
-        raise _ScriptError(
-            "Current git status is dirty. "
-            "Commit, stash or revert your changes before sending for review."
-        )
     branch = _get_head()
     default = _get_default()
     remote_branch = _get_existing_remote()
     if not base:
         base = _get_best_base_branch(branch, remote_branch, default) or default
-    merge_base = _run_git(["merge-base", "HEAD", f"{_REMOTE_REPO}/{base}"])
+    merge_base = _run_git(["merge-base", "HEAD", f"{_REMOTE_REPO}/{base}"], lean=True)
     is_new = is_new or branch == default
     if is_new:
         new_branch = _create_branch_for_review(merge_base, username)
         if new_branch:
             branch = new_branch
         elif branch == default:
-            # List branches in user-preferred order, without the asterisk on current branch.
-            all_branches = _run_git(["branch", "--format=%(refname:short)"]).split("\n")
-            all_branches.remove(default)
+            all_branches = [b for b in _get_git_context().branches if b != default]
             raise _ScriptError("branch required:\n\t%s", "\n\t".join(all_branches))
         else:
             raise _ScriptError("No change to put in a new review.")
@@ -565,19 +722,41 @@ def _get_best_base_branch(
 ) -> Optional[str]:
     """Guess on which branch the changes should be merged."""
 
-    remote_branches: Optional[str] = None
-    for sha1 in _run_git(["rev-list", "--max-count=5", branch, "--"]).split("\n")[1:]:
-        if remote_branches := _run_git(
-            ["branch", "-r", "--contains", sha1, "--list", f"{_REMOTE_REPO}/*"]
-        ):
-            break
+    # List the last commits that are not on any other remote branch, with the boundary commits
+    # (prefixed by "-") from which the branch forked.
+    own_remote = (
+        [f"--exclude={_REMOTE_REPO}/{remote}"] if remote and remote != default else []
+    )
+    commits = _run_git(
+        ["rev-list", "--boundary", "--max-count=5", branch, "--not"]
+        + own_remote
+        + [f"--remotes={_REMOTE_REPO}", "--"],
+        lean=True,
+    ).split("\n")
+    forks = [sha1[1:] for sha1 in commits if sha1.startswith("-")]
+    unpushed_count = sum(1 for sha1 in commits if sha1 and not sha1.startswith("-"))
+    if unpushed_count >= 5:
+        return None
+    if not unpushed_count:
+        fork = branch
+    elif forks:
+        fork = forks[0]
     else:
         return None
-    if any(rb.endswith(f"/{default}") for rb in remote_branches.split("\n")):
+    remote_branches = _run_git(
+        [
+            "for-each-ref",
+            "--contains",
+            fork,
+            "--format=%(refname:lstrip=3)",
+            f"refs/remotes/{_REMOTE_REPO}/",
+        ],
+        lean=True,
+    ).split("\n")
+    if default in remote_branches:
         return None
-    for remote_branch in remote_branches.split("\n"):
-        base = remote_branch.rsplit("/", 1)[-1]
-        if base != remote:
+    for base in remote_branches:
+        if base and base != remote:
             return base
     return None
 
@@ -585,6 +764,8 @@ def _get_best_base_branch(
 def _cleanup_branch_name(branch: str) -> str:
     """Avoid unwanted characters in branche names."""
 
+    if branch.isascii():
+        return branch.replace("#", "")
     return _FORBIDDEN_CHARS_REGEX.sub("", unicodedata.normalize("NFD", branch))
 
 
@@ -601,18 +782,30 @@ def _push(refs: _References, is_forced: bool) -> None:
 def _make_pr_message(refs: _References, reviewers: list[str]) -> str:
     """Create a message for the review request."""
 
-    message = _run_git(
-        ["log", "--format=%B", f"{_REMOTE_REPO}/{refs.base}..{refs.branch}"]
-    )
-    if hook_message := _run_git_review_hook(refs, reviewers):
+    with futures.ThreadPoolExecutor(max_workers=2) as executor:
+        # The hook does not need the log, so both run concurrently.
+        log = executor.submit(
+            _run_git,
+            ["log", "--format=%B", f"{_REMOTE_REPO}/{refs.base}..{refs.branch}"],
+            lean=True,
+        )
+        hook = executor.submit(_run_git_review_hook, refs, reviewers)
+        message = log.result()
+        hook_message = hook.result()
+    if hook_message:
         message += f"\n\n{hook_message}"
     return message
 
 
+@functools.lru_cache()
+def _get_toplevel() -> str:
+    return _run_git(["rev-parse", "--show-toplevel"], lean=True)
+
+
 def _run_git_review_hook(refs: _References, reviewers: list[str]) -> str:
     """Run the git-review hook if it exists."""
 
-    hook_script = f'{_run_git(["rev-parse", "--show-toplevel"])}/.git-review-hook'
+    hook_script = f"{_get_toplevel()}/.git-review-hook"
     if not os.access(hook_script, os.X_OK):
         if path.exists(hook_script):
             logging.warning(
@@ -639,6 +832,15 @@ def _run_git_review_hook(refs: _References, reviewers: list[str]) -> str:
         return ""
 
 
+def _get_project_name(remote_url: str, prefixes: tuple[str, ...]) -> Optional[str]:
+    """Extract the project name from a remote URL, if it has one of the given prefixes."""
+
+    for prefix in prefixes:
+        if remote_url.startswith(prefix):
+            return remote_url[len(prefix) :].removesuffix(".git")
+    return None
+
+
 class _RemoteGitPlatform:
     _platform: str
 
@@ -647,12 +849,12 @@ class _RemoteGitPlatform:
 
     @staticmethod
     def from_url(remote_url: str) -> "_RemoteGitPlatform":
-        """Factory for subclasses depending on URL regex."""
+        """Factory for subclasses, detecting the platform from the remote URL prefix."""
 
-        if gitlab_match := _GITLAB_URL_REGEX.match(remote_url):
-            return _GitlabPlatform(gitlab_match[1])
-        if github_match := _GITHUB_URL_REGEX.match(remote_url):
-            return _GithubPlatform(github_match[1])
+        if gitlab_project := _get_project_name(remote_url, _GITLAB_URL_PREFIXES):
+            return _GitlabPlatform(gitlab_project)
+        if github_project := _get_project_name(remote_url, _GITHUB_URL_PREFIXES):
+            return _GithubPlatform(github_project)
         if remote_url.startswith("/"):
             return _LocalPlatform(path.basename(remote_url))
         raise NotImplementedError(
@@ -676,10 +878,9 @@ class _RemoteGitPlatform:
     ) -> None:
         """Ask for a review on the specific platform."""
 
-        review_id = self._has_existing_review(refs)
-        if not review_id:
-            message = _make_pr_message(refs, reviewers)
-            review_id = self._request_review(refs, reviewers, message)
+        review_id = self._has_existing_review(refs) or self._create_review(
+            refs, reviewers
+        )
         if reviewers:
             # Remove duplicates while preserving ordering.
             recents = list(dict.fromkeys(reviewers + _GIT_CONFIG.recent_reviewers))
@@ -697,7 +898,7 @@ class _RemoteGitPlatform:
     def add_review_label(self, branch: str) -> None:
         """Mark all references issues as 'in review'."""
 
-        commit_msg = _run_git(["log", branch, "-1", r"--format=%B"])
+        commit_msg = _run_git(["log", branch, "-1", r"--format=%B"], lean=True)
         issues = {
             issue.lstrip("#")
             for line in commit_msg.split("\n")
@@ -714,6 +915,10 @@ class _RemoteGitPlatform:
     def _has_existing_review(self, refs: _References) -> Optional[str]:
         return self._get_review_number(refs.remote)
 
+    def _create_review(self, refs: _References, reviewers: list[str]) -> Optional[str]:
+        message = _make_pr_message(refs, reviewers)
+        return self._request_review(refs, reviewers, message)
+
     def _not_implemented(self, command: str, context: str = "") -> NoReturn:
         raise NotImplementedError(
             f"`{command}`{context} is not implemented for {self._platform} yet."
@@ -756,13 +961,22 @@ class _GitlabPlatform(_RemoteGitPlatform):
 
     def __init__(self, project_name: str) -> None:
         super().__init__(project_name)
-        if not gitlab:
+        try:
+            # Only imported here, as this is not needed when pushing to a Github repo.
+            import gitlab  # pylint: disable=import-outside-toplevel,redefined-outer-name
+        except ImportError as error:
             raise _ScriptError(
                 "gitlab tool is not installed, please install it:\n"
                 "  https://github.com/bayesimpact/bayes-developer-setup/blob/HEAD/gitlab-cli.md"
-            )
+            ) from error
         self.client = gitlab.Gitlab.from_config()
-        self.project = self.client.projects.get(project_name)
+        self._user_ids: dict[str, list[int]] = {}
+
+    @functools.cached_property
+    def project(self) -> "gitlab.v4.objects.Project":
+        """The Gitlab project for the current repository."""
+
+        return self.client.projects.get(self.project_name)
 
     @property
     def engineers(self) -> Set[str]:
@@ -772,9 +986,20 @@ class _GitlabPlatform(_RemoteGitPlatform):
         return set()
 
     def _get_reviewers(self, reviewers: list[str]) -> list[int]:
-        return [
-            user.id for r in reviewers for user in self.client.users.list(username=r)
-        ]
+        for reviewer in reviewers:
+            if reviewer not in self._user_ids:
+                self._user_ids[reviewer] = [
+                    user.id for user in self.client.users.list(username=reviewer)
+                ]
+        return [user_id for r in reviewers for user_id in self._user_ids[r]]
+
+    def _create_review(self, refs: _References, reviewers: list[str]) -> Optional[str]:
+        with futures.ThreadPoolExecutor(max_workers=1) as executor:
+            # Look the reviewers up on Gitlab while the review message is being built.
+            users = executor.submit(self._get_reviewers, reviewers)
+            message = _make_pr_message(refs, reviewers)
+            users.result()
+        return self._request_review(refs, reviewers, message)
 
     def _get_merge_request(
         self, branch: str, base: Optional[str]
@@ -822,17 +1047,20 @@ class _GitlabPlatform(_RemoteGitPlatform):
 
 
 class _GithubPlatform(_RemoteGitPlatform):
-    _platform = "Github"
+    # Whether the token cannot be used on the Github API, so that hub should be used instead.
+    # Whether the Github API rejected the token, so that hub should be used instead.
+    _is_token_unusable = False
 
-    def __init__(self, project_name: str) -> None:
-        super().__init__(project_name)
-        try:
-            _run_hub(["browse", "-u"])
-        except subprocess.CalledProcessError as error:
+    def request_review(
+        self, refs: _References, reviewers: list[str], is_auto_assigned: bool = False
+    ) -> None:
+        # Even with a Github token, hub is needed to find existing pull requests.
+        if not shutil.which("hub"):
             raise _ScriptError(
-                "hub tool is not installed, or wrongly configured.\n"
+                "hub tool is not installed.\n"
                 "Please install it with ~/.bayes-developer-setup/install.sh"
-            ) from error
+            )
+        super().request_review(refs, reviewers, is_auto_assigned)
 
     @property
     def engineers(self) -> Set[str]:
@@ -873,32 +1101,56 @@ class _GithubPlatform(_RemoteGitPlatform):
             stdin=json.dumps({"labels": [label]}),
         )
 
+    def _post_with_token(self, api_path: str, payload: dict[str, Any]) -> Optional[Any]:
+        """Post directly to the Github API, or return None if there is no usable token."""
+
+        token = _get_github_token()
+        if not token or self._is_token_unusable:
+            return None
+        try:
+            return _post_github_api(api_path, payload, token)
+        except _GithubAPIError as error:
+            # Github answers 404 when the token cannot see a private repository.
+            if error.code not in (401, 403, 404):
+                raise
+            logging.warning(
+                "The Github token cannot be used, using hub instead.\n%s", error
+            )
+        except _GithubNetworkError as error:
+            logging.warning("Using hub instead.\n%s", error)
+        self._is_token_unusable = True
+        return None
+
+    def _post_api(self, api_path: str, payload: dict[str, Any]) -> Any:
+        """Post to the Github API, directly if a token is available, or through hub."""
+
+        if (response := self._post_with_token(api_path, payload)) is not None:
+            return response
+        return json.loads(
+            _run_hub(["api", api_path, "--input", "-"], stdin=json.dumps(payload))
+        )
+
     def _add_reviewers(self, refs: _References, reviewers: list[str]) -> None:
         """Add reviewers to the current Pull Request."""
 
         if not reviewers:
             return
         pull_number = self._get_review_number(refs.remote, refs.base)
+        self._assign_reviewers(pull_number, reviewers)
+
+    def _assign_reviewers(
+        self, pull_number: Optional[str], reviewers: list[str]
+    ) -> None:
         assignees = requested_reviewers = set(reviewers)
         if self.engineers:
             requested_reviewers = requested_reviewers & set(self.engineers)
-        _run_hub(
-            [
-                "api",
-                r"/repos/{owner}/{repo}/pulls/" f"{pull_number}/requested_reviewers",
-                "--input",
-                "-",
-            ],
-            stdin=json.dumps({"reviewers": list(requested_reviewers)}),
+        self._post_api(
+            f"/repos/{self.project_name}/pulls/{pull_number}/requested_reviewers",
+            {"reviewers": list(requested_reviewers)},
         )
-        _run_hub(
-            [
-                "api",
-                r"/repos/{owner}/{repo}/issues/" f"{pull_number}/assignees",
-                "--input",
-                "-",
-            ],
-            stdin=json.dumps({"assignees": list(assignees)}),
+        self._post_api(
+            f"/repos/{self.project_name}/issues/{pull_number}/assignees",
+            {"assignees": list(assignees)},
         )
 
     def _request_review(
@@ -909,23 +1161,37 @@ class _GithubPlatform(_RemoteGitPlatform):
         if not message:
             self._add_reviewers(refs, reviewers)
             return None
-        hub_command = [
-            "pull-request",
-            "-m",
-            message,
-            "-h",
-            refs.remote,
-            "-b",
-            refs.base,
-        ]
-        if reviewers:
-            assignees = requested_reviewers = set(reviewers)
-            if self.engineers:
-                requested_reviewers = requested_reviewers & set(self.engineers)
-            hub_command.extend(
-                ["-a", ",".join(assignees), "-r", ",".join(requested_reviewers)]
-            )
-        output = _run_hub(hub_command)
+        title, unused_sep, body = message.partition("\n")
+        if pull_request := self._post_with_token(
+            f"/repos/{self.project_name}/pulls",
+            {
+                "title": title,
+                "body": body.strip(),
+                "head": refs.remote,
+                "base": refs.base,
+            },
+        ):
+            output = pull_request["html_url"]
+            if reviewers:
+                self._assign_reviewers(str(pull_request["number"]), reviewers)
+        else:
+            hub_command = [
+                "pull-request",
+                "-m",
+                message,
+                "-h",
+                refs.remote,
+                "-b",
+                refs.base,
+            ]
+            if reviewers:
+                assignees = requested_reviewers = set(reviewers)
+                if self.engineers:
+                    requested_reviewers = requested_reviewers & set(self.engineers)
+                hub_command.extend(
+                    ["-a", ",".join(assignees), "-r", ",".join(requested_reviewers)]
+                )
+            output = _run_hub(hub_command)
         logging.info(
             output.replace("github.com", "reviewable.io/reviews").replace("pull/", "")
         )
@@ -999,9 +1265,8 @@ class _LocalPlatform(_RemoteGitPlatform):
 def _get_platform() -> _RemoteGitPlatform:
     """Get the relevant review platform once and for all."""
 
-    return _RemoteGitPlatform.from_url(
-        _GIT_CONFIG.get_config(f"remote.{_REMOTE_REPO}.url")
-    )
+    remote_url = _GIT_CONFIG.get_config(f"remote.{_REMOTE_REPO}.url")
+    return _RemoteGitPlatform.from_url(remote_url)
 
 
 def _can_review(potential: str, absentee_emails: list[str]) -> bool:
@@ -1081,9 +1346,21 @@ def prepare_push_and_request_review(
             "Could not find username, most probably you need to setup an email with:\n"
             "  git config user.email <me@bayesimpact.org>"
         )
-    refs = _get_git_branches(username, base, is_new)
-    if _has_git_diff(refs.merge_base):
-        _push(refs, not is_new and _get_existing_remote() == refs.remote)
+    with futures.ThreadPoolExecutor(max_workers=3) as executor:
+        # Those read-only probes do not depend on one another, so they run concurrently.
+        is_dirty = executor.submit(_has_git_diff, "HEAD")
+        git_context = executor.submit(_get_git_context)
+        review_platform = executor.submit(_get_platform)
+        if is_dirty.result():
+            raise _ScriptError(
+                "Current git status is dirty. "
+                "Commit, stash or revert your changes before sending for review."
+            )
+        git_context.result()
+        refs = _get_git_branches(username, base, is_new)
+        if _has_git_diff(refs.merge_base):
+            _push(refs, not is_new and _get_existing_remote() == refs.remote)
+        review_platform.result()
     if is_auto:
         reviewer = _get_auto_reviewer()
         if reviewer:
@@ -1092,13 +1369,19 @@ def prepare_push_and_request_review(
     _get_platform().request_review(refs, reviewers, is_auto_assigned=is_auto)
     if not is_submit:
         return
-    local_sha = _run_git(["rev-parse", refs.branch])
-    remote_sha = _run_git(["rev-parse", f"{_REMOTE_REPO}/{refs.remote}"])
-    if local_sha != remote_sha:
+    with _GitBatch() as git_batch:
+        local_sha = git_batch.resolve(refs.branch)
+        remote_sha = git_batch.resolve(f"{_REMOTE_REPO}/{refs.remote}")
+    if not local_sha or local_sha != remote_sha:
         raise _ScriptError(
             "Local branch is not in the same state as remote branch. Not submitting."
         )
-    _run_git(["submit"], env=dict(os.environ, GIT_SUBMIT_AUTO_MERGE="1"))
+    # Nothing is left to do afterwards, so git submit replaces the current process.
+    submit_command = ["git", "submit"]
+    _xtrace(submit_command)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execvpe("git", submit_command, dict(os.environ, GIT_SUBMIT_AUTO_MERGE="1"))
 
 
 def _get_default_username(username: str) -> str:
@@ -1129,8 +1412,93 @@ def _browse_to(branch: str) -> None:
         raise
 
 
-def main(string_args: Optional[list[str]] = None) -> None:
-    """Parse CLI arguments and run the script."""
+class _CommandLineArgs(typing.NamedTuple):
+    """Parsed command line arguments."""
+
+    reviewers: list[str]
+    auto: bool
+    force: bool
+    new: bool
+    xtrace: Optional[str]
+    submit: bool
+    username: str
+    base: Optional[str]
+    cache: bool
+    browse: Optional[str]
+
+
+# Options of the command line that do not take a value, with their destination.
+_FLAG_OPTIONS = {
+    "-a": "auto",
+    "--auto": "auto",
+    "-f": "force",
+    "--force": "force",
+    "-n": "new",
+    "--new": "new",
+    "-s": "submit",
+    "--submit": "submit",
+}
+# Options of the command line that take a value, with their destination.
+_VALUE_OPTIONS = {
+    "-x": "xtrace",
+    "--xtrace": "xtrace",
+    "-u": "username",
+    "--username": "username",
+    "-b": "base",
+    "--base": "base",
+}
+
+
+def _parse_simple_args(string_args: list[str]) -> Optional[_CommandLineArgs]:
+    """Parse the most common command lines without argparse.
+
+    Returns None for anything else (help, browse, combined flags, reviewers interleaved with
+    options, completion, etc.), so that argparse handles it.
+    """
+
+    if os.getenv("_ARGCOMPLETE"):
+        return None
+    values: dict[str, Any] = {"cache": True}
+    reviewers: list[str] = []
+    has_options_after_reviewers = False
+    remaining_args = iter(string_args)
+    for arg in remaining_args:
+        # Argparse only accepts reviewers in one block: let it report an error for any other.
+        has_options_after_reviewers |= bool(reviewers) and arg.startswith("-")
+        if arg in _FLAG_OPTIONS:
+            values[_FLAG_OPTIONS[arg]] = True
+        elif arg in _VALUE_OPTIONS:
+            value = next(remaining_args, None)
+            if value is None or value.startswith("-"):
+                return None
+            values[_VALUE_OPTIONS[arg]] = value
+        elif arg == "--no-cache":
+            values["cache"] = False
+        elif arg.startswith("-"):
+            return None
+        elif has_options_after_reviewers:
+            return None
+        else:
+            reviewers.append(arg)
+    return _CommandLineArgs(
+        reviewers=reviewers,
+        auto=values.get("auto", False),
+        force=values.get("force", False),
+        new=values.get("new", False),
+        xtrace=values.get("xtrace"),
+        submit=values.get("submit", False),
+        username=_get_default_username(values.get("username", "")),
+        base=values.get("base"),
+        cache=values["cache"],
+        browse=None,
+    )
+
+
+def _parse_args(string_args: Optional[list[str]]) -> _CommandLineArgs:
+    """Parse CLI arguments with argparse, to get help, errors and auto-completion."""
+
+    # Only imported here, as most command lines do not need it.
+    import argparse  # pylint: disable=import-outside-toplevel
 
     # TODO(cyrille): Do not auto-complete on mutually exclusive args (reviewers, auto, browse).
     parser = argparse.ArgumentParser(description="Start a review for your change list.")
@@ -1207,20 +1575,35 @@ def main(string_args: Optional[list[str]] = None) -> None:
         nargs="?",
         const=_BROWSE_CURRENT,
     )
-    if argcomplete:
-        setattr(
-            reviewer_action,
-            "completer",
-            lambda **kw: _get_platform().get_available_reviewers(),
-        )
-        setattr(force_action, "completer", argcomplete.SuppressCompleter())
-        setattr(
-            browse_action,
-            "completer",
-            lambda **kw: _get_platform().get_available_reviews(),
-        )
-        argcomplete.autocomplete(parser)
-    args = parser.parse_args(string_args)
+    # Only import argcomplete when the shell is actually asking for completions.
+    if os.getenv("_ARGCOMPLETE"):
+        try:
+            import argcomplete  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            # This is not needed for the script to work.
+            argcomplete = None
+        if argcomplete:
+            setattr(
+                reviewer_action,
+                "completer",
+                lambda **kw: _get_platform().get_available_reviewers(),
+            )
+            setattr(force_action, "completer", argcomplete.SuppressCompleter())
+            setattr(
+                browse_action,
+                "completer",
+                lambda **kw: _get_platform().get_available_reviews(),
+            )
+            argcomplete.autocomplete(parser)
+    return _CommandLineArgs(**vars(parser.parse_args(string_args)))
+
+
+def main(string_args: Optional[list[str]] = None) -> None:
+    """Parse CLI arguments and run the script."""
+
+    args = _parse_simple_args(
+        sys.argv[1:] if string_args is None else string_args
+    ) or _parse_args(string_args)
     # TODO(cyrille): Update log level depending on required verbosity.
     logging.basicConfig(level=logging.INFO)
     if not args.cache:
@@ -17,3 +17,90 @@ Feature: git review
     And the "username-whatever" git branch in "origin" should exist
     And the "main" git branch should be in sync with "main" in "origin"
     And the file "successful submission" should exist
+
+  Scenario: Submit a branch created on main
+    Given a dummy git repo in "origin"
+    And I am in a "work" git repo cloned from "origin"
+    And I commit a file "successful submission" with message "whatever" and content:
+      """
+      Whatever
+      """
+    When I run `git review -s`
+    Then the exit status should be 0
+    And I should be on "main" git branch
+    And the "whatever" git branch should not exist
+    And the "main" git branch should be in sync with "main" in "origin"
+    And the file "successful submission" should exist
+
+  Scenario: Failed submission after review
+    Given a dummy git repo in "origin"
+    And I am in a "work" git repo cloned from "origin"
+    And a file "conflict" is committed on "main" git branch in "origin" with:
+      """
+      Whatever
+      """
+    And I commit a file "successful submission" with message "whatever" and content:
+      """
+      Whatever
+      """
+    When I run `git review -s`
+    Then the exit status should be 7
+    And the output should contain "Something went wrong, aborting"
+    And I should be on "whatever" git branch
+    And the "username-whatever" git branch in "origin" should exist
+
+  Scenario: Review a branch stacked on another reviewed branch
+    Given a dummy git repo in "origin"
+    And I am in a "work" git repo cloned from "origin"
+    And I create a "feat/part" git branch from "main"
+    And I commit a file "part" with:
+      """
+      Part
+      """
+    And I successfully run `git push -u origin feat/part`
+    And I create a "child" git branch from "feat/part"
+    And I commit a file "child file" with:
+      """
+      Child
+      """
+    And I successfully run `git review`
+    And I commit a file "other child file" with:
+      """
+      Other child
+      """
+    When I run `git review -x ++`
+    Then the exit status should be 0
+    And the output should contain "++ git merge-base HEAD origin/feat/part"
+    And the output should contain "++ git push -f -u origin child:username-child"
+    And I should be on "child" git branch
+    And the "child" git branch should be in sync with "username-child" in "origin"
+    And the "feat/part" git branch should be in sync with "feat/part" in "origin"
+
+  Scenario: Use the common options
+    Given a dummy git repo in "origin"
+    And I am in a "work" git repo cloned from "origin"
+    And I commit a file "successful submission" with message "whatever" and content:
+      """
+      Whatever
+      """
+    When I run `git review -x ++ -u someone -b main -s`
+    Then the exit status should be 0
+    And the output should contain "++ git push -u origin whatever:someone-whatever"
+    And the output should contain "++ git submit"
+    And I should be on "main" git branch
+    And the "someone-whatever" git branch in "origin" should exist
+    And the "main" git branch should be in sync with "main" in "origin"
+    And the file "successful submission" should exist
+
+  Scenario: Reject reviewers interleaved with options
+    Given a dummy git repo in "origin"
+    And I am in a "work" git repo cloned from "origin"
+    And I commit a file "successful submission" with message "whatever" and content:
+      """
+      Whatever
+      """
+    When I run `git review alice -n bob`
+    Then the exit status should be 2
+    And the output should contain "unrecognized arguments: bob"
+    And I should be on "main" git branch
+    And the "username-whatever" git branch in "origin" should not exist